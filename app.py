@@ -1,12 +1,14 @@
 import streamlit as st
 import os
 import json
-import numpy as np
-from src.pdf_reader import extract_text_from_pdf
-from src.text_splitter import chunk_text
+import time
+from src.pdf_reader import extract_pages
+from src.text_splitter import build_chunks
 from src.embedder import get_embedding
-from src.search_engine import search
-from src.ollama_integration import ask_llm_with_context, is_ollama_available
+from src.search_engine import save_index
+from src.ollama_integration import is_ollama_available
+from src.reranker import rerank, is_reranker_available
+from src.conversation import ConversationSession
 from src.summarizer import summarize_all_documents
 
 # Page config
@@ -109,6 +111,8 @@ st.markdown("""
 # File paths
 CHUNKS_FILE = "data/outputs/chunks.json"
 EMBEDDINGS_FILE = "data/embeddings/chunks.npy"
+METADATA_FILE = "data/embeddings/metadata.npz"
+VERSION_FILE = "data/embeddings/index_version"
 
 # Session state
 if 'processed' not in st.session_state:
@@ -119,6 +123,8 @@ if 'processed_files' not in st.session_state:
     st.session_state.processed_files = []
 if 'total_chunks' not in st.session_state:
     st.session_state.total_chunks = 0
+if 'conversation' not in st.session_state:
+    st.session_state.conversation = ConversationSession()
 
 # Load existing data
 def load_existing_data():
@@ -138,6 +144,12 @@ def load_existing_data():
 
 load_existing_data()
 
+# Cross-encoder scores are raw logits, so only bi-encoder scores are shown as a percentage
+def format_score(result):
+    if 'rerank_score' in result:
+        return f"Re-rank score: {result['rerank_score']:.2f}"
+    return f"Score: {int(result['score']*100)}%"
+
 # Header
 st.markdown("""
 <div class="main-header">
@@ -165,9 +177,6 @@ with st.sidebar:
     if uploaded_files:
         if st.button("Process Documents", use_container_width=True):
             with st.spinner("Processing..."):
-                os.makedirs("data/outputs", exist_ok=True)
-                os.makedirs("data/embeddings", exist_ok=True)
-                
                 all_chunks = []
                 all_embeddings = []
                 
@@ -177,25 +186,22 @@ with st.sidebar:
                     with open(pdf_path, "wb") as f:
                         f.write(file.read())
                     
-                    text = extract_text_from_pdf(pdf_path)
+                    pages = extract_pages(pdf_path)
                     os.remove(pdf_path)
                     
-                    if text:
-                        chunks = chunk_text(text)
-                        for chunk in chunks:
-                            all_chunks.append({"file": file.name, "text": chunk})
-                            all_embeddings.append(get_embedding(chunk))
+                    for chunk in build_chunks(file.name, pages, time.time()):
+                        all_chunks.append(chunk)
+                        all_embeddings.append(get_embedding(chunk["text"]))
                     
                     progress_bar.progress((idx + 1) / len(uploaded_files))
                 
                 if all_chunks:
-                    with open(CHUNKS_FILE, "w", encoding="utf-8") as f:
-                        json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-                    np.save(EMBEDDINGS_FILE, np.array(all_embeddings))
+                    save_index(all_chunks, all_embeddings)
                     
                     st.session_state.processed = True
                     st.session_state.processed_files = list(set([c['file'] for c in all_chunks]))
                     st.session_state.total_chunks = len(all_chunks)
+                    st.session_state.conversation = ConversationSession()
                     
                     st.success(f"✅ Processed {len(all_chunks)} chunks!")
                     st.rerun()
@@ -208,6 +214,25 @@ with st.sidebar:
     st.subheader("Settings")
     top_k = st.slider("Results per document", 1, 5, 2)
     
+    # Filters are applied before scoring, so narrowing them makes search cheaper
+    filter_files = st.multiselect("Search only in", st.session_state.processed_files)
+    page_col1, page_col2 = st.columns(2)
+    with page_col1:
+        first_page = st.number_input("From page", min_value=1, value=1)
+    with page_col2:
+        last_page = st.number_input("To page (0 = end)", min_value=0, value=0)
+    search_filters = {"file": filter_files}
+    if first_page > 1 or last_page > 0:
+        search_filters["page"] = (int(first_page), int(last_page) or None)
+    
+    # Re-ranking: search a wider shortlist, keep only the best chunks for the LLM
+    use_rerank = st.checkbox("Re-rank results", value=is_reranker_available(),
+                             disabled=not is_reranker_available(),
+                             help="Needs offline_models/ms-marco-MiniLM-L-6-v2 (see for_model_down.py)")
+    if use_rerank:
+        shortlist_k = st.slider("Shortlist per document", 2, 20, 10)
+        rerank_top_n = st.slider("Chunks sent to LLM", 1, 10, 3)
+    
     st.markdown("---")
     
     # Documents
@@ -224,10 +249,10 @@ with st.sidebar:
         st.session_state.chat_history = []
         st.session_state.processed_files = []
         st.session_state.total_chunks = 0
-        if os.path.exists(CHUNKS_FILE):
-            os.remove(CHUNKS_FILE)
-        if os.path.exists(EMBEDDINGS_FILE):
-            os.remove(EMBEDDINGS_FILE)
+        st.session_state.conversation = ConversationSession()
+        for path in (CHUNKS_FILE, EMBEDDINGS_FILE, METADATA_FILE, VERSION_FILE):
+            if os.path.exists(path):
+                os.remove(path)
         st.rerun()
 
 # Stats
@@ -273,14 +298,20 @@ if st.session_state.processed:
                           unsafe_allow_html=True)
                 st.markdown(f'<div class="ai-msg"><strong>AI:</strong><br>{chat["answer"]}</div>', 
                           unsafe_allow_html=True)
+                if chat.get('timing'):
+                    timing = chat['timing']
+                    total = timing.get('retrieval_s', 0) + timing.get('rerank_s', 0) + timing['llm_s']
+                    st.caption(f"Answered in {total:.1f}s (search {timing.get('retrieval_s', 0):.2f}s, "
+                               f"re-rank {timing.get('rerank_s', 0):.2f}s, LLM {timing['llm_s']:.1f}s), "
+                               f"{timing['prompt_chars']} prompt characters sent")
                 
                 if chat.get('sources'):
                     with st.expander(f"📚 View {len(chat['sources'])} sources"):
                         for idx, src in enumerate(chat['sources'], 1):
                             st.markdown(f"""
                             <div class="source-box">
-                                <strong>Source {idx}:</strong> {src['file']}<br>
-                                <strong>Score:</strong> {int(src['score']*100)}%<br>
+                                <strong>Source {idx}:</strong> {src['file']} (page {src.get('page', '?')})<br>
+                                <strong>{format_score(src)}</strong><br>
                                 {src['text'][:200]}...
                             </div>
                             """, unsafe_allow_html=True)
@@ -300,14 +331,22 @@ if st.session_state.processed:
         
         if search_clicked and query:
             with st.spinner("🔍 Searching..."):
-                results = search(query, top_k_per_doc=top_k)
+                # Follow-ups reuse the conversation's earlier retrieval instead of searching from scratch
+                conversation = st.session_state.conversation
+                if use_rerank:
+                    shortlist = conversation.retrieve(query, top_k_per_doc=shortlist_k, filters=search_filters)
+                    rerank_start = time.perf_counter()
+                    results = rerank(query, shortlist, top_n=rerank_top_n)
+                    conversation.turns[-1]["rerank_s"] = time.perf_counter() - rerank_start
+                else:
+                    results = conversation.retrieve(query, top_k_per_doc=top_k, filters=search_filters)
                 st.session_state.last_results = results
             
             if results:
                 st.success(f"✅ Found {len(results)} relevant chunks")
                 with st.expander("📄 View retrieved chunks"):
                     for idx, r in enumerate(results, 1):
-                        st.markdown(f"**{idx}. {r['file']}** (Score: {int(r['score']*100)}%)")
+                        st.markdown(f"**{idx}. {r['file']}**, page {r.get('page', '?')} ({format_score(r)})")
                         st.text(r['text'][:300] + "..." if len(r['text']) > 300 else r['text'])
                         st.markdown("---")
             else:
@@ -317,11 +356,12 @@ if st.session_state.processed:
         if generate_clicked and st.session_state.get('last_results'):
             if ollama_status:
                 with st.spinner("🤖 Generating answer..."):
-                    answer = ask_llm_with_context(query, st.session_state.last_results)
+                    answer = st.session_state.conversation.answer(query, st.session_state.last_results)
                     st.session_state.chat_history.append({
                         'question': query,
                         'answer': answer,
-                        'sources': st.session_state.last_results
+                        'sources': st.session_state.last_results,
+                        'timing': st.session_state.conversation.turns[-1]
                     })
                     st.session_state.last_results = []
                     st.rerun()
@@ -392,13 +432,14 @@ st.markdown("""
 
 <div class="mindmap-node">
 <strong>📤 Step 1 – Upload PDFs:</strong>  
-You upload one or multiple PDF files. The app extracts their text using <code>extract_text_from_pdf()</code>.
+You upload one or multiple PDF files. The app extracts them page by page using <code>extract_pages()</code>,  
+skipping blank pages, turning tables into row records and caching every page for re-uploads.
 </div>
 
 <div class="mindmap-node">
 <strong>🧩 Step 2 – Chunk Text:</strong>  
-The extracted text is split into smaller, meaningful sections using <code>chunk_text()</code>.  
-This helps the app process large documents efficiently.
+The pages are split into smaller, meaningful sections using <code>build_chunks()</code>.  
+Each chunk keeps its file, page and section, so searches can be narrowed to a document or page range.
 </div>
 
 <div class="mindmap-node">
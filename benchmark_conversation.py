@@ -0,0 +1,74 @@
+# Per-turn latency of a scripted conversation with three paths:
+#   cli:     search + `ollama run` every turn (what app.py used to do)
+#   http:    search + Ollama HTTP API with no context, i.e. stateless but same transport as the session
+#   session: ConversationSession (cached retrieval + Ollama context kept between turns)
+# "saved" compares session with http, so it only counts retrieval reuse and the skipped prompt prefix,
+# not process start-up. "prompt tokens" is Ollama's prompt_eval_count: tokens it actually had to evaluate.
+# Needs an index in data/ (process some PDFs in the app first) and Ollama running.
+# Usage: python benchmark_conversation.py ["first question" "follow-up" ...]
+import sys
+import time
+from src.search_engine import search
+from src.conversation import ConversationSession
+from src.ollama_integration import ask_llm_with_context, build_prompt, generate_with_context, is_ollama_available
+
+TOP_K = 2
+DEFAULT_TURNS = [
+    "What are the main findings of the documents?",
+    "What are the main findings?",
+    "Which datasets support those findings?",
+    "And what limitations do the authors mention?",
+]
+
+def stateless_cli(turns):
+    rows = []
+    for query in turns:
+        start = time.perf_counter()
+        results = search(query, top_k_per_doc=TOP_K)
+        retrieval_s = time.perf_counter() - start
+        ask_llm_with_context(query, results)
+        rows.append({"total_s": time.perf_counter() - start, "retrieval_s": retrieval_s})
+    return rows
+
+def stateless_http(turns):
+    rows = []
+    for query in turns:
+        start = time.perf_counter()
+        results = search(query, top_k_per_doc=TOP_K)
+        retrieval_s = time.perf_counter() - start
+        prompt = build_prompt(query, results)
+        stats = generate_with_context(prompt, None)[2]
+        rows.append({
+            "total_s": time.perf_counter() - start,
+            "retrieval_s": retrieval_s,
+            "prompt_chars": len(prompt),
+            "prompt_eval_count": stats.get("prompt_eval_count", 0),
+        })
+    return rows
+
+def with_session(turns):
+    session = ConversationSession()
+    for query in turns:
+        session.answer(query, session.retrieve(query, top_k_per_doc=TOP_K))
+    return [{**t, "total_s": t["retrieval_s"] + t["llm_s"]} for t in session.turns]
+
+if __name__ == "__main__":
+    if not is_ollama_available():
+        sys.exit("Ollama is not available.")
+    turns = sys.argv[1:] or DEFAULT_TURNS
+
+    # Warm up: load the index and the model once so turn 1 is comparable
+    generate_with_context(build_prompt("Hello", search(turns[0], top_k_per_doc=TOP_K)), None)
+
+    cli = stateless_cli(turns)
+    http = stateless_http(turns)
+    session = with_session(turns)
+
+    print(f"{'turn':<6}{'cli s':>8}{'http s':>8}{'session s':>11}{'saved s':>9}"
+          f"{'retr ms http/session':>24}{'prompt tokens http/session':>30}{'prompt chars http/session':>29}")
+    for n, (c, h, s) in enumerate(zip(cli, http, session), start=1):
+        retrieval = f"{h['retrieval_s'] * 1000:.1f} / {s['retrieval_s'] * 1000:.1f}"
+        tokens = f"{h['prompt_eval_count']} / {s['prompt_eval_count']}"
+        chars = f"{h['prompt_chars']} / {s['prompt_chars']}"
+        print(f"{n:<6}{c['total_s']:>8.2f}{h['total_s']:>8.2f}{s['total_s']:>11.2f}{h['total_s'] - s['total_s']:>9.2f}"
+              f"{retrieval:>24}{tokens:>30}{chars:>29}")
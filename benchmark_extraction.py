@@ -0,0 +1,95 @@
+# Extraction benchmark on synthetic table PDFs (same layout as report_lab_pdf.py):
+# plain pypdf extract_text + chunk_text vs. extract_pages() with a cold and a warm page cache.
+# Usage: python benchmark_extraction.py [rows_per_pdf] [pdf_count]
+import os
+import random
+import sys
+import tempfile
+import time
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, PageBreak, Paragraph
+from reportlab.lib.styles import getSampleStyleSheet
+from pypdf import PdfReader
+from src.pdf_reader import extract_pages
+from src.text_splitter import chunk_text, build_chunks
+
+COLUMNS = ["Rank", "Series_Title", "Released_Year", "Certificate", "Runtime", "Genre", "IMDB_Rating",
+           "Overview", "Meta_score", "Director", "Star1", "Star2", "Star3", "Star4", "No_of_Votes", "Gross"]
+COL_WIDTHS = [0.03, 0.15, 0.04, 0.04, 0.04, 0.05, 0.04, 0.15, 0.04, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05, 0.05]
+
+def make_pdf(path, n_rows, seed):
+    rng = random.Random(seed)
+    words = ["drama", "crime", "action", "epic", "story", "war", "love", "city", "night", "king"]
+    data = [COLUMNS] + [
+        [str(i + 1), f"{rng.choice(words).title()} {rng.choice(words).title()}", str(rng.randint(1930, 2020)),
+         rng.choice(["A", "U", "UA", "R"]), f"{rng.randint(80, 200)} min", rng.choice(words).title(),
+         f"{rng.uniform(7.6, 9.3):.1f}", " ".join(rng.choice(words) for _ in range(6)).capitalize() + ".",
+         str(rng.randint(40, 100)),
+         f"Director {rng.randint(1, 300)}", *[f"Star {rng.randint(1, 900)}" for _ in range(4)],
+         str(rng.randint(25000, 2300000)), str(rng.randint(1000, 900000000))]
+        for i in range(n_rows)
+    ]
+    table = Table(data, colWidths=[x * landscape(A4)[0] for x in COL_WIDTHS])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 5),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]))
+    intro = Paragraph("Synthetic IMDB-style table used for the extraction benchmark. " * 5,
+                      getSampleStyleSheet()["Normal"])
+    # A blank page in the middle exercises the skip path
+    SimpleDocTemplate(path, pagesize=landscape(A4)).build([intro, PageBreak(), PageBreak(), table])
+
+def baseline(paths):
+    """The previous pipeline: full extract_text on every page, then chunk_text on the joined text."""
+    pages, chunks = 0, []
+    for path in paths:
+        reader = PdfReader(path)
+        full_text = ""
+        for page in reader.pages:
+            pages += 1
+            text = page.extract_text()
+            if text:
+                full_text += text + "\n"
+        chunks += chunk_text(full_text.strip())
+    return pages, chunks
+
+def layout_aware(paths, cache_dir):
+    pages, chunks = 0, []
+    for path in paths:
+        records = extract_pages(path, cache_dir=cache_dir)
+        pages += len(records)
+        chunks += [c["text"] for c in build_chunks(os.path.basename(path), records, 0.0)]
+    return pages, chunks
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    pages, chunks = fn(*args)
+    return pages, chunks, time.perf_counter() - start
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_pdfs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"table_{i}.pdf") for i in range(n_pdfs)]
+        for seed, path in enumerate(paths):
+            make_pdf(path, n_rows, seed)
+        cache_dir = os.path.join(tmp, "cache")
+
+        runs = [
+            ("baseline", timed(baseline, paths)),
+            ("cold cache", timed(layout_aware, paths, cache_dir)),
+            ("warm cache", timed(layout_aware, paths, cache_dir)),
+        ]
+
+    print(f"{n_pdfs} PDFs x {n_rows} rows")
+    # The largest chunk matters as much as the count: the embedder truncates long input
+    print(f"{'mode':<12}{'pages':>7}{'seconds':>10}{'pages/sec':>12}{'chunks':>9}{'max chunk chars':>17}")
+    for name, (pages, chunks, seconds) in runs:
+        print(f"{name:<12}{pages:>7}{seconds:>10.2f}{pages / seconds:>12.1f}{len(chunks):>9}"
+              f"{max(map(len, chunks)):>17}")
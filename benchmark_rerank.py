@@ -0,0 +1,53 @@
+# End-to-end benchmark: plain search with a high top_k vs. a wide shortlist re-ranked down to a few chunks.
+# Needs an index in data/ (process some PDFs in the app first).
+# Usage: python benchmark_rerank.py "question one" "question two" [--no-llm]
+import sys
+import time
+from src.search_engine import search
+from src.reranker import rerank, is_reranker_available, get_model
+from src.ollama_integration import ask_llm_with_context, build_prompt, is_ollama_available
+
+PLAIN_TOP_K = 5        # what users set the sidebar slider to because bi-encoder scores are noisy
+SHORTLIST_TOP_K = 10   # per-document shortlist handed to the re-ranker
+RERANK_TOP_N = 3       # chunks actually sent to the LLM
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run(query, use_llm):
+    rows = []
+
+    results, search_s = timed(search, query, top_k_per_doc=PLAIN_TOP_K)
+    rows.append(("plain", search_s, 0.0, results))
+
+    shortlist, shortlist_s = timed(search, query, top_k_per_doc=SHORTLIST_TOP_K)
+    reranked, rerank_s = timed(rerank, query, shortlist, top_n=RERANK_TOP_N)
+    rows.append(("rerank", shortlist_s, rerank_s, reranked))
+
+    for name, search_s, rerank_s, chunks in rows:
+        prompt_chars = len(build_prompt(query, chunks))
+        llm_s = timed(ask_llm_with_context, query, chunks)[1] if use_llm else float("nan")
+        total_s = search_s + rerank_s + (llm_s if use_llm else 0.0)
+        print(f"{name:<8}{len(chunks):>7}{prompt_chars:>14}{search_s * 1000:>12.1f}"
+              f"{rerank_s * 1000:>12.1f}{llm_s:>10.2f}{total_s:>10.2f}")
+
+if __name__ == "__main__":
+    use_llm = "--no-llm" not in sys.argv and is_ollama_available()
+    queries = [q for q in sys.argv[1:] if q != "--no-llm"] or ["What are the main findings?"]
+
+    if not is_reranker_available():
+        print("Re-ranker model not found, the rerank rows only truncate the shortlist.")
+    if not use_llm:
+        print("LLM timing skipped (Ollama unavailable or --no-llm).")
+
+    # Warm up: load the index and models once so the rows only time the queries
+    search(queries[0])
+    if is_reranker_available():
+        get_model()
+
+    for query in queries:
+        print(f"\nQuery: {query}")
+        print(f"{'mode':<8}{'chunks':>7}{'prompt chars':>14}{'search ms':>12}{'rerank ms':>12}{'llm s':>10}{'total s':>10}")
+        run(query, use_llm)
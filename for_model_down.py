@@ -1,4 +1,8 @@
-from sentence_transformers import SentenceTransformer
+from sentence_transformers import SentenceTransformer, CrossEncoder
 
 model = SentenceTransformer('all-mpnet-base-v2')
 model.save('offline_models/all-mpnet-base-v2')
+
+# Optional re-ranker used by src/reranker.py
+reranker = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+reranker.save('offline_models/ms-marco-MiniLM-L-6-v2')
@@ -0,0 +1,174 @@
+#keeps the state of a chat between turns: which chunks were retrieved, the query embedding built up so far,
+#which chunks the LLM has already seen and Ollama's conversation context, so a follow-up question only pays
+#for what is actually new in it
+import re
+import time
+import numpy as np
+from src.embedder import get_embedding
+from src.search_engine import search, score_chunks, index_version
+from src.ollama_integration import (
+    NUM_CTX, ask_llm_with_context, build_prompt, build_followup_prompt, generate_with_context
+)
+
+CHARS_PER_TOKEN = 4     # rough estimate for sizing a prompt before sending it
+ANSWER_RESERVE = 512    # tokens kept free in the window for the model's answer
+
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "can", "do", "does", "for", "how", "in", "is", "it", "its",
+    "me", "more", "of", "on", "or", "tell", "that", "the", "this", "to", "what", "which", "why",
+    "with", "you", "was", "were", "be", "by", "from", "as", "at", "they", "their", "them",
+}
+
+def query_terms(query: str):
+    """Content words of a query, in order, without duplicates."""
+    terms = []
+    for term in re.findall(r"[a-z0-9]+", query.lower()):
+        if term not in STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+class ConversationSession:
+    """
+    One chat over the loaded documents.
+
+    retrieve() reuses the previous turn's chunks and query embedding, and only
+    embeds and searches for terms the conversation has not seen yet.
+    answer() keeps Ollama's context between turns, so each follow-up prompt
+    only carries the question and chunks the model has not been given yet.
+    Before the context would outgrow num_ctx (and Ollama would silently drop
+    the oldest tokens, i.e. the first chunks) the conversation starts over.
+    Every turn's timings are appended to self.turns.
+    """
+
+    def __init__(self, model="mistral", num_ctx=NUM_CTX):
+        self.model = model
+        self.num_ctx = num_ctx
+        self.filters = None
+        self.index_version = None
+        self.top_k_per_doc = 0  # depth the cached results were searched with
+        self.terms = set()
+        self.query_embedding = None
+        self.results = {}       # chunk id -> search result, for everything retrieved so far
+        self.sent_ids = set()   # chunk ids already in the LLM conversation
+        self.llm_context = None
+        self.context_tokens = 0
+        self.turns = []
+
+    def reset_retrieval(self):
+        self.top_k_per_doc = 0
+        self.terms = set()
+        self.query_embedding = None
+        self.results = {}
+
+    def retrieve(self, query: str, top_k_per_doc: int = 2, filters=None):
+        """Same output as search(), reusing earlier turns where possible."""
+        start = time.perf_counter()
+        version = index_version()
+        if version != self.index_version:
+            # The index was rebuilt (maybe by another session): cached ids point at other chunks now
+            self.reset_retrieval()
+            self.sent_ids = set()
+            self.llm_context = None
+            self.context_tokens = 0
+            self.index_version = version
+        if filters != self.filters:
+            self.reset_retrieval()
+            self.filters = filters
+
+        terms = query_terms(query)
+        new_terms = [t for t in terms if t not in self.terms]
+
+        rescore = False
+        fresh = []
+        if self.query_embedding is None:
+            self.query_embedding = get_embedding(query)
+            fresh = search(query, top_k_per_doc=top_k_per_doc, filters=filters,
+                           query_embedding=self.query_embedding)
+        else:
+            if top_k_per_doc > self.top_k_per_doc:
+                # The cache holds fewer chunks per document than asked for: deepen it
+                fresh = search(query, top_k_per_doc=top_k_per_doc, filters=filters,
+                               query_embedding=self.query_embedding)
+            if new_terms:
+                # Only the new terms are embedded and searched for; the conversation
+                # embedding moves towards them and the cached chunks are re-scored on it
+                new_embedding = get_embedding(" ".join(new_terms))
+                fresh += search(query, top_k_per_doc=top_k_per_doc, filters=filters,
+                                query_embedding=new_embedding)
+                combined = self.query_embedding + new_embedding
+                self.query_embedding = combined / np.linalg.norm(combined)
+                rescore = True
+        self.top_k_per_doc = max(self.top_k_per_doc, top_k_per_doc)
+
+        for entry in fresh:
+            self.results.setdefault(entry["id"], entry)
+        self.terms.update(terms)
+
+        if rescore:
+            ids = list(self.results)
+            for i, score in zip(ids, score_chunks(ids, self.query_embedding)):
+                self.results[i] = {**self.results[i], "score": float(score)}
+
+        merged = sorted(self.results.values(), key=lambda x: x["score"], reverse=True)
+        per_file = {}
+        top_results = []
+        for entry in merged:
+            if per_file.get(entry["file"], 0) < top_k_per_doc:
+                per_file[entry["file"]] = per_file.get(entry["file"], 0) + 1
+                top_results.append(entry)
+
+        self.turns.append({
+            "query": query,
+            "new_terms": len(new_terms),
+            "searched": bool(fresh),
+            "retrieval_s": time.perf_counter() - start,
+        })
+        return top_results
+
+    def answer(self, query: str, context_chunks):
+        """Answer with the LLM, sending only chunks it has not seen in this conversation."""
+        start = time.perf_counter()
+        context_reset = False
+        new_chunks = [c for c in context_chunks if c.get("id") not in self.sent_ids]
+
+        if self.llm_context is not None:
+            prompt = build_followup_prompt(query, new_chunks)
+            if self.context_tokens + len(prompt) // CHARS_PER_TOKEN + ANSWER_RESERVE > self.num_ctx:
+                # Start a fresh conversation so every chunk the answer needs is in the window
+                self.llm_context = None
+                self.context_tokens = 0
+                self.sent_ids = set()
+                new_chunks = list(context_chunks)
+                context_reset = True
+        if self.llm_context is None:
+            prompt = build_prompt(query, new_chunks)
+
+        try:
+            answer, self.llm_context, stats = generate_with_context(
+                prompt, self.llm_context, model=self.model, num_ctx=self.num_ctx
+            )
+            self.context_tokens = len(self.llm_context or [])
+            if self.llm_context:
+                self.sent_ids.update(c.get("id") for c in new_chunks)
+            else:
+                # No conversation state came back: the next turn has to send every chunk again
+                self.sent_ids = set()
+        except (OSError, ValueError):
+            # Ollama's HTTP server is not reachable: fall back to the stateless CLI path
+            answer = ask_llm_with_context(query, context_chunks, model=self.model)
+            self.llm_context = None
+            self.context_tokens = 0
+            self.sent_ids = set()
+            stats = {}
+
+        # Attach the timings to this question's retrieval record, if there is one
+        if not self.turns or self.turns[-1]["query"] != query or "llm_s" in self.turns[-1]:
+            self.turns.append({"query": query})
+        self.turns[-1].update({
+            "llm_s": time.perf_counter() - start,
+            "prompt_chars": len(prompt),
+            "prompt_eval_count": stats.get("prompt_eval_count", 0),
+            "context_tokens": self.context_tokens,
+            "context_reset": context_reset,
+        })
+        return answer
@@ -1,4 +1,9 @@
+import json
 import subprocess
+import urllib.request
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+NUM_CTX = 4096  # context window requested from Ollama, in tokens
 
 def is_ollama_available() -> bool:
     try:
@@ -9,13 +14,10 @@ def is_ollama_available() -> bool:
     except Exception:
         return False
 
-def ask_llm_with_context(query, context_chunks, model="mistral"):
-    if not is_ollama_available():
-        return "Ollama local model is not available. Please ensure it is installed and running."
-
+def build_prompt(query, context_chunks):
     context_text = "\n\n".join([c["text"] for c in context_chunks])
 
-    prompt = (
+    return (
         f"You are an AI assistant analyzing multiple research papers or documents.\n"
         f"Context from the documents:\n{context_text}\n\n"
         f"Question: {query}\n"
@@ -23,6 +25,54 @@ def ask_llm_with_context(query, context_chunks, model="mistral"):
         f"Provide a structured, readable format."
     )
 
+def build_followup_prompt(query, context_chunks):
+    """Prompt for a later turn: the earlier context is already in the model's conversation state."""
+    if not context_chunks:
+        return f"Follow-up question: {query}\nAnswer using the documents above."
+
+    context_text = "\n\n".join([c["text"] for c in context_chunks])
+    return (
+        f"Additional context from the documents:\n{context_text}\n\n"
+        f"Follow-up question: {query}\n"
+        f"Answer using all the documents above."
+    )
+
+def generate_with_context(prompt, context=None, model="mistral", keep_alive="10m", num_ctx=NUM_CTX):
+    """
+    Call Ollama's HTTP API instead of `ollama run`. Passing back the context
+    returned by the previous turn lets the server reuse the conversation state
+    instead of re-evaluating the whole prompt prefix, and keep_alive keeps the
+    model loaded between turns. num_ctx is sent explicitly so callers know the
+    window their context has to fit in.
+    Returns (answer, context, stats) where stats holds Ollama's timing counters.
+    """
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": keep_alive,
+        "options": {"num_ctx": num_ctx},
+    }
+    if context:
+        payload["context"] = context
+
+    request = urllib.request.Request(
+        OLLAMA_URL,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=600) as response:
+        body = json.loads(response.read().decode("utf-8"))
+
+    stats = {key: body.get(key, 0) for key in ("prompt_eval_count", "prompt_eval_duration", "eval_count", "total_duration")}
+    return body.get("response", "").strip(), body.get("context"), stats
+
+def ask_llm_with_context(query, context_chunks, model="mistral"):
+    if not is_ollama_available():
+        return "Ollama local model is not available. Please ensure it is installed and running."
+
+    prompt = build_prompt(query, context_chunks)
+
     try:
         result = subprocess.run(
             ["ollama", "run", model],
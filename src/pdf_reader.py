@@ -1,15 +1,193 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+from typing import List
 from pypdf import PdfReader
 
+PAGE_CACHE_DIR = "data/cache/pages"
+CACHE_VERSION = 2
+
+# Text-showing operators (Tj, TJ, ' and ") in a raw content stream
+TEXT_OPERATORS = re.compile(rb"T[jJ]|\)\s*['\"]")
+ROW_TOLERANCE = 2.0      # points; fragments this close vertically are on the same row
+MIN_TABLE_ROWS = 3
+MIN_TABLE_COLUMNS = 3
+
 def extract_text_from_pdf(pdf_path: str) -> str:
     """Extract full text from a PDF file."""
+    pages = extract_pages(pdf_path)
+    return "\n".join([p["text"] for p in pages if p["text"]]).strip()
+
+def extract_pages(pdf_path: str, cache_dir: str = PAGE_CACHE_DIR) -> List[dict]:
+    """
+    Extract every page as a record:
+      {"kind": "text", "text": ...}
+      {"kind": "table", "text": ..., "notes": ..., "header": [...], "rows": [[...], ...], "anchors": [...]}
+      {"kind": "blank", "text": ""}   (no text operators, e.g. blank or image-only)
+    Records are cached per file hash and page index, so a re-uploaded file is
+    not parsed again.
+    """
     try:
+        digest = file_hash(pdf_path)
+        cache = load_page_cache(digest, cache_dir)
+        page_count = cache.get("page_count")
+        if page_count is not None and all(str(i) in cache["pages"] for i in range(page_count)):
+            return [cache["pages"][str(i)] for i in range(page_count)]
+
         reader = PdfReader(pdf_path)
-        full_text = ""
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                full_text += text + "\n"
-        return full_text.strip()
+        cache["page_count"] = len(reader.pages)
+        previous = None
+        records = []
+        for index, page in enumerate(reader.pages):
+            record = cache["pages"].get(str(index))
+            if record is None:
+                record = extract_page(page, previous)
+                cache["pages"][str(index)] = record
+            records.append(record)
+            previous = record
     except Exception as e:
         print(f"Error reading PDF: {e}")
-        return ""
+        return []
+
+    # A cache that can't be written only costs speed on the next upload
+    try:
+        save_page_cache(digest, cache, cache_dir)
+    except OSError as e:
+        print(f"Could not write page cache: {e}")
+    return records
+
+def file_hash(pdf_path: str) -> str:
+    sha = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_page_cache(digest: str, cache_dir: str = PAGE_CACHE_DIR) -> dict:
+    path = os.path.join(cache_dir, f"{digest}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "page_count": None, "pages": {}}
+
+def save_page_cache(digest: str, cache: dict, cache_dir: str = PAGE_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, f"{digest}.json"), "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+def has_text(page) -> bool:
+    """Cheap check on the raw content stream, without running text extraction."""
+    resources = page.get("/Resources")
+    if resources is not None:
+        xobjects = resources.get_object().get("/XObject")
+        if xobjects is not None:
+            for xobject in xobjects.get_object().values():
+                # Form XObjects can hold text of their own; only images are safe to skip
+                if xobject.get_object().get("/Subtype") == "/Form":
+                    return True
+    contents = page.get_contents()
+    return contents is not None and TEXT_OPERATORS.search(contents.get_data()) is not None
+
+def extract_page(page, previous=None) -> dict:
+    """Extract one page; previous is the record of the page before, used to continue tables."""
+    if not has_text(page):
+        return {"kind": "blank", "text": ""}
+
+    fragments = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if text.strip():
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            fragments.append((x, y, text.strip()))
+
+    text = (page.extract_text(visitor_text=visitor) or "").strip()
+    if not text:
+        return {"kind": "blank", "text": ""}
+
+    # A table running on from the previous page is matched on that page's column positions
+    table = None
+    if previous and previous["kind"] == "table":
+        table = detect_table(fragments, previous["anchors"])
+        if table is not None:
+            header = previous["header"]
+            rows = [row for row in table["rows"] if row != header]
+
+    if table is None:
+        table = detect_table(fragments)
+        if table is None:
+            return {"kind": "text", "text": text}
+        rows = table["rows"]
+        # Only a line with a cell in most columns can be the header
+        if sum(1 for cell in rows[0] if cell) > len(table["anchors"]) / 2:
+            header, rows = rows[0], rows[1:]
+        else:
+            header = [f"Column {i + 1}" for i in range(len(table["anchors"]))]
+
+    notes = "\n".join(table["notes"])
+    return {
+        "kind": "table",
+        "text": "\n".join([part for part in (notes, serialize_table(header, rows)) if part]),
+        "notes": notes,
+        "header": header,
+        "rows": rows,
+        "anchors": table["anchors"],
+    }
+
+def detect_table(fragments, anchors=None):
+    """
+    Group positioned text fragments into rows and columns.
+    Column anchors (x positions) are taken from the row with the most cells
+    unless given, e.g. from the previous page of the same table.
+    Returns {"anchors": [...], "rows": [[cell, ...], ...], "notes": [line, ...]} if the
+    page is laid out as a table, else None. Lines that don't sit on the columns
+    (captions, titles, footnotes) are kept as notes instead of becoming rows.
+    """
+    lines = []
+    for x, y, text in sorted(fragments, key=lambda f: (-f[1], f[0])):
+        if lines and abs(lines[-1][0] - y) <= ROW_TOLERANCE:
+            lines[-1][1].append((x, text))
+        else:
+            lines.append((y, [(x, text)]))
+
+    min_rows = 1
+    if anchors is None:
+        multi_cell = [cells for _, cells in lines if len(cells) >= MIN_TABLE_COLUMNS]
+        if len(lines) < MIN_TABLE_ROWS or len(multi_cell) < 0.6 * len(lines):
+            return None
+        anchors = sorted(x for x, _ in max(multi_cell, key=len))
+        min_rows = MIN_TABLE_ROWS
+
+    # In a real table most fragments start on an anchor; prose split into words
+    # only lines up at the margin
+    rows = []
+    notes = []
+    aligned = 0
+    for _, cells in lines:
+        cells = sorted(cells)
+        # Each fragment snaps to the nearest anchor on its left
+        columns = [max(bisect.bisect_right(anchors, x + ROW_TOLERANCE) - 1, 0) for x, _ in cells]
+        on_anchor = [abs(x - anchors[c]) <= ROW_TOLERANCE for (x, _), c in zip(cells, columns)]
+        aligned += sum(on_anchor)
+
+        if all(on_anchor) and len(set(columns)) >= 2:
+            row = [""] * len(anchors)
+            for (_, text), column in zip(cells, columns):
+                row[column] = f"{row[column]} {text}".strip()
+            rows.append(row)
+        else:
+            notes.append(" ".join(text for _, text in cells))
+
+    if aligned < 0.8 * len(fragments) or len(rows) < min_rows:
+        return None
+    return {"anchors": anchors, "rows": rows, "notes": notes}
+
+def serialize_table(header, rows) -> str:
+    """One line per row record, header first."""
+    return "\n".join([" | ".join(row) for row in [header] + rows])
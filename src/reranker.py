@@ -0,0 +1,45 @@
+#second retrieval stage: the bi-encoder in search() gives a wide shortlist cheaply, then a small cross-encoder
+#reads each (question, chunk) pair together and scores it properly, so only the best few chunks go to the LLM
+import os
+import time
+from sentence_transformers import CrossEncoder
+
+# Load model locally (download it with for_model_down.py)
+model_path = os.path.join("offline_models", "ms-marco-MiniLM-L-6-v2")
+model = None
+
+def is_reranker_available() -> bool:
+    return os.path.isdir(model_path)
+
+def get_model():
+    global model
+    if model is None:
+        model = CrossEncoder(model_path)
+    return model
+
+def rerank(query: str, candidates, top_n: int = 3, batch_size: int = 16, time_budget: float = 2.0):
+    """
+    Re-score a search() shortlist with the cross-encoder and keep the best top_n.
+    Candidates are scored in batches, best bi-encoder score first; once time_budget
+    seconds have passed no new batch is started and the unscored candidates keep
+    their search() order behind the scored ones.
+    Returns the same dicts with an added "rerank_score" where scored.
+    """
+    candidates = sorted(candidates, key=lambda x: x["score"], reverse=True)
+    if not candidates or not is_reranker_available():
+        return candidates[:top_n]
+
+    cross_encoder = get_model()
+    deadline = time.perf_counter() + time_budget
+    scored = []
+
+    for start in range(0, len(candidates), batch_size):
+        if scored and time.perf_counter() > deadline:
+            break
+        batch = candidates[start:start + batch_size]
+        scores = cross_encoder.predict([(query, c["text"]) for c in batch], batch_size=batch_size)
+        for entry, score in zip(batch, scores):
+            scored.append({**entry, "rerank_score": float(score)})
+
+    scored.sort(key=lambda x: x["rerank_score"], reverse=True)
+    return (scored + candidates[len(scored):])[:top_n]
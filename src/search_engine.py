@@ -1,43 +1,220 @@
 import json
+import numbers
+import os
+import time
 import numpy as np
 from src.embedder import get_embedding
 
 CHUNKS_FILE = "data/outputs/chunks.json"
 EMBEDDINGS_FILE = "data/embeddings/chunks.npy"
+METADATA_FILE = "data/embeddings/metadata.npz"
+VERSION_FILE = "data/embeddings/index_version"
+
+# path -> (mtime, value), so repeated queries don't re-parse the whole corpus
+_cache = {}
+
+def _load_cached(path, loader, key=None):
+    key = key or path
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(key)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, loader(path))
+        _cache[key] = cached
+    return cached[1]
+
+def _read_chunks(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)  # Returns list of {"file":..., "page":..., "section":..., "ingested_at":..., "text":...}
 
 def load_chunks():
-    with open(CHUNKS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)  # Returns list of {"file":..., "text":...}
+    return _load_cached(CHUNKS_FILE, _read_chunks)
 
 def load_embeddings():
-    return np.load(EMBEDDINGS_FILE)
+    # Memory-mapped so a filtered query only reads the rows it scores
+    return _load_cached(EMBEDDINGS_FILE, lambda path: np.load(path, mmap_mode="r"))
+
+def build_metadata(chunks):
+    """
+    Columnar metadata for the chunk list, aligned with the embedding rows.
+    Files are also stored as partitions (file_order / file_offsets) so a
+    file filter resolves to its row indices without touching other files.
+    """
+    file_names, file_ids = np.unique([c["file"] for c in chunks], return_inverse=True)
+    section_names, section_ids = np.unique([c.get("section", "") for c in chunks], return_inverse=True)
+    file_ids = file_ids.astype(np.int32)
+
+    file_order = np.argsort(file_ids, kind="stable")
+    file_offsets = np.concatenate([[0], np.cumsum(np.bincount(file_ids, minlength=len(file_names)))])
+
+    return {
+        "file_names": file_names,
+        "file_ids": file_ids,
+        "file_order": file_order.astype(np.int64),
+        "file_offsets": file_offsets.astype(np.int64),
+        "page": np.array([c.get("page", 0) for c in chunks], dtype=np.int32),
+        "section_names": section_names,
+        "section_ids": section_ids.astype(np.int32),
+        "ingested_at": np.array([c.get("ingested_at", 0.0) for c in chunks], dtype=np.float64),
+    }
+
+def _read_metadata(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+def load_metadata():
+    if os.path.exists(METADATA_FILE):
+        return _load_cached(METADATA_FILE, _read_metadata)
+    # Older indexes were saved without metadata; derive it from the chunks once
+    return _load_cached(CHUNKS_FILE, lambda path: build_metadata(load_chunks()), key="derived_metadata")
+
+def save_index(chunks, embeddings):
+    """
+    Persist chunks, their embeddings and the columnar metadata together.
+    Everything is written to temporary files first and then swapped in with
+    os.replace, so a cached memmap keeps pointing at the old, unchanged file.
+    The three swaps are bracketed by VERSION_FILE ("<generation> writing"
+    before, "<generation>" after), which load_index() uses to tell whether it
+    read the files from one generation.
+    """
+    os.makedirs(os.path.dirname(CHUNKS_FILE), exist_ok=True)
+    os.makedirs(os.path.dirname(EMBEDDINGS_FILE), exist_ok=True)
+
+    with open(CHUNKS_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False, indent=2)
+    with open(EMBEDDINGS_FILE + ".tmp", "wb") as f:
+        np.save(f, np.array(embeddings))
+    with open(METADATA_FILE + ".tmp", "wb") as f:
+        np.savez(f, **build_metadata(chunks))
+
+    generation = str(time.time_ns())
+    _write_version(f"{generation} writing")
+    for path in (METADATA_FILE, EMBEDDINGS_FILE, CHUNKS_FILE):
+        os.replace(path + ".tmp", path)
+    _write_version(generation)
+
+def _write_version(value):
+    with open(VERSION_FILE + ".tmp", "w", encoding="utf-8") as f:
+        f.write(value)
+    os.replace(VERSION_FILE + ".tmp", VERSION_FILE)
+
+def _as_list(value):
+    return [value] if isinstance(value, (str, numbers.Integral)) else list(value)
+
+def filter_indices(metadata, filters=None):
+    """
+    Resolve a filter expression to the chunk row indices it allows.
+
+    Supported keys (all optional, combined with AND):
+      "file": name or list of names
+      "page": page number or (first, last) inclusive range; None on either side is open.
+              Chunks with an unknown page (0, from older indexes) are never filtered out.
+      "section": section heading or list of headings
+      "ingested_after" / "ingested_before": Unix timestamps
+    """
+    filters = filters or {}
+    n = len(metadata["file_ids"])
+
+    if filters.get("file"):
+        parts = []
+        for name in _as_list(filters["file"]):
+            hits = np.flatnonzero(metadata["file_names"] == name)
+            if hits.size:
+                f = hits[0]
+                start, end = metadata["file_offsets"][f], metadata["file_offsets"][f + 1]
+                parts.append(metadata["file_order"][start:end])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        indices = np.sort(np.concatenate(parts))
+    else:
+        indices = np.arange(n)
+
+    mask = np.ones(len(indices), dtype=bool)
+
+    page = filters.get("page")
+    if page is not None:
+        first, last = (page, page) if isinstance(page, numbers.Integral) else page
+        pages = metadata["page"][indices]
+        unknown = pages == 0
+        if first is not None:
+            mask &= (pages >= first) | unknown
+        if last is not None:
+            mask &= (pages <= last) | unknown
+
+    if filters.get("section"):
+        wanted = np.flatnonzero(np.isin(metadata["section_names"], _as_list(filters["section"])))
+        mask &= np.isin(metadata["section_ids"][indices], wanted)
+
+    if filters.get("ingested_after") is not None:
+        mask &= metadata["ingested_at"][indices] >= filters["ingested_after"]
+    if filters.get("ingested_before") is not None:
+        mask &= metadata["ingested_at"][indices] <= filters["ingested_before"]
+
+    return indices[mask]
+
+def index_version():
+    """Changes whenever the index is rebuilt; chunk ids are only valid within one version."""
+    if os.path.exists(VERSION_FILE):
+        with open(VERSION_FILE, "r", encoding="utf-8") as f:
+            return f.read()
+    # Indexes saved before the version file existed
+    paths = [p for p in (CHUNKS_FILE, EMBEDDINGS_FILE, METADATA_FILE) if os.path.exists(p)]
+    return " ".join(str(os.stat(p).st_mtime_ns) for p in paths)
+
+def load_index(attempts: int = 5):
+    """
+    Load chunks, embeddings and metadata from one generation of the index.
+    Retries while another session is in the middle of save_index().
+    """
+    for _ in range(attempts):
+        version = index_version()
+        if not version.endswith("writing"):
+            chunks, embeddings, metadata = load_chunks(), load_embeddings(), load_metadata()
+            if index_version() == version and len(chunks) == len(embeddings) == len(metadata["file_ids"]):
+                return chunks, embeddings, metadata
+        time.sleep(0.05)
+    raise RuntimeError("The index is being rebuilt, please try again.")
+
+def score_chunks(ids, query_embedding):
+    """Similarity of the given chunk ids to query_embedding, reading only those rows."""
+    embeddings = load_index()[1]
+    return np.dot(embeddings[np.asarray(ids, dtype=np.int64)], query_embedding)
 
-def search(query: str, top_k_per_doc: int = 1):
+def search(query: str, top_k_per_doc: int = 1, filters=None, query_embedding=None):
     """
     Cross-paper search: pick top_k chunks per PDF based on similarity to query.
-    Returns list of dicts: {"file": ..., "text": ..., "score": ...}
+    Filters (see filter_indices) are applied before scoring, so only the
+    matching rows are read and compared. Pass query_embedding to skip
+    embedding the query again.
+    Returns list of dicts: {"id": ..., "file": ..., "page": ..., "section": ..., "text": ..., "score": ...}
     """
-    chunks = load_chunks()
-    embeddings = load_embeddings()
+    chunks, embeddings, metadata = load_index()
 
-    query_embedding = get_embedding(query)
-    similarities = np.dot(embeddings, query_embedding)
+    indices = filter_indices(metadata, filters)
+    if len(indices) == 0:
+        return []
 
-    chunk_scores = [
-        {"file": chunks[i]["file"], "text": chunks[i]["text"], "score": similarities[i]}
-        for i in range(len(chunks))
-    ]
+    rows = embeddings if len(indices) == len(embeddings) else embeddings[indices]
+    if query_embedding is None:
+        query_embedding = get_embedding(query)
+    similarities = np.dot(rows, query_embedding)
 
-    # Group by file
-    grouped = {}
-    for entry in chunk_scores:
-        grouped.setdefault(entry["file"], []).append(entry)
+    # Group by file: order by (file, descending score) and keep the first top_k of each run
+    file_ids = metadata["file_ids"][indices]
+    order = np.lexsort((-similarities, file_ids))
+    run_start = np.searchsorted(file_ids[order], file_ids[order], side="left")
+    keep = order[np.arange(len(order)) - run_start < top_k_per_doc]
 
-    # Pick top chunks per file
     top_results = []
-    for file, entries in grouped.items():
-        entries.sort(key=lambda x: x["score"], reverse=True)
-        top_results.extend(entries[:top_k_per_doc])
+    for local in keep:
+        i = int(indices[local])
+        top_results.append({
+            "id": i,
+            "file": chunks[i]["file"],
+            "page": chunks[i].get("page"),
+            "section": chunks[i].get("section", ""),
+            "text": chunks[i]["text"],
+            "score": float(similarities[local]),
+        })
 
     # Sort globally by similarity
     top_results.sort(key=lambda x: x["score"], reverse=True)
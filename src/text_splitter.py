@@ -21,3 +21,67 @@ def chunk_text(text: str, max_chunk_size: int = 500) -> List[str]:
         chunks.append(current_chunk.strip())
 
     return chunks
+
+
+HEADING_PATTERN = re.compile(r'^(\d+(\.\d+)*\.?\s+[A-Z][^.!?]{2,80}|[A-Z][A-Z0-9 ,:&-]{3,80})$')
+
+def find_headings(text: str) -> List[str]:
+    """Return lines that look like section headings (numbered or ALL CAPS)."""
+    return [line.strip() for line in text.splitlines() if HEADING_PATTERN.match(line.strip())]
+
+def chunk_table(header: List[str], rows: List[List[str]], max_chunk_size: int = 500) -> List[str]:
+    """
+    Packs whole table rows into chunks of approximately max_chunk_size characters of rows.
+    Every chunk starts with the header line so its rows stay self-describing.
+    """
+    header_line = " | ".join(header)
+    chunks = []
+    current_rows = ""
+
+    for row in rows:
+        line = " | ".join(row)
+        if current_rows and len(current_rows) + len(line) + 1 > max_chunk_size:
+            chunks.append(header_line + current_rows)
+            current_rows = ""
+        current_rows += "\n" + line
+
+    if current_rows:
+        chunks.append(header_line + current_rows)
+
+    return chunks
+
+def build_chunks(file_name: str, pages: List, ingested_at: float, max_chunk_size: int = 500) -> List[dict]:
+    """
+    Chunk a document page by page so every chunk carries its metadata.
+    Pages are plain strings or extract_pages() records; table pages are chunked by rows.
+    Returns list of dicts: {"file", "page", "section", "ingested_at", "text"}
+    """
+    records = []
+    section = ""
+
+    for page_number, page in enumerate(pages, start=1):
+        if isinstance(page, dict) and page["kind"] == "table":
+            notes = page.get("notes", "")
+            page_chunks = chunk_text(notes, max_chunk_size) if notes else []
+            page_chunks += chunk_table(page["header"], page["rows"], max_chunk_size)
+        else:
+            page_text = page["text"] if isinstance(page, dict) else page
+            page_chunks = chunk_text(page_text, max_chunk_size) if page_text else []
+
+        for chunk in page_chunks:
+            if not chunk:
+                continue
+            headings = find_headings(chunk)
+            if headings and chunk.startswith(headings[0]):
+                section = headings[0]
+            records.append({
+                "file": file_name,
+                "page": page_number,
+                "section": section,
+                "ingested_at": ingested_at,
+                "text": chunk,
+            })
+            if headings:
+                section = headings[-1]
+
+    return records
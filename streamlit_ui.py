@@ -1,11 +1,10 @@
 import streamlit as st
 import os
-import json
-import numpy as np
-from src.pdf_reader import extract_text_from_pdf
-from src.text_splitter import chunk_text
+import time
+from src.pdf_reader import extract_pages
+from src.text_splitter import build_chunks
 from src.embedder import get_embedding
-from src.search_engine import search
+from src.search_engine import search, save_index
 from src.ollama_integration import ask_llm_with_context
 from src.summarizer import summarize_all_documents
 
@@ -15,9 +14,6 @@ st.markdown(
     "Upload multiple PDFs, process them, ask intelligent questions, or generate a combined summary offline."
 )
 
-CHUNKS_FILE = "data/outputs/chunks.json"
-EMBEDDINGS_FILE = "data/embeddings/chunks.npy"
-
 # -------------------- Upload PDFs --------------------
 uploaded_files = st.file_uploader(
     "Upload PDF files", type=["pdf"], accept_multiple_files=True
@@ -26,9 +22,6 @@ uploaded_files = st.file_uploader(
 if uploaded_files:
     if st.button("Process Documents"):
         with st.spinner("Processing PDFs..."):
-            os.makedirs("data/outputs", exist_ok=True)
-            os.makedirs("data/embeddings", exist_ok=True)
-
             all_chunks = []
             all_embeddings = []
 
@@ -37,20 +30,16 @@ if uploaded_files:
                 with open(pdf_path, "wb") as f:
                     f.write(uploaded_file.read())
 
-                raw_text = extract_text_from_pdf(pdf_path)
+                pages = extract_pages(pdf_path)
                 os.remove(pdf_path)
 
-                if len(raw_text) > 0:
-                    chunks = chunk_text(raw_text)
-                    for chunk in chunks:
-                        all_chunks.append({"file": uploaded_file.name, "text": chunk})
-                        all_embeddings.append(get_embedding(chunk))
+                for chunk in build_chunks(uploaded_file.name, pages, time.time()):
+                    all_chunks.append(chunk)
+                    all_embeddings.append(get_embedding(chunk["text"]))
 
             if all_chunks:
-                # Save chunks and embeddings
-                with open(CHUNKS_FILE, "w", encoding="utf-8") as f:
-                    json.dump(all_chunks, f, ensure_ascii=False, indent=2)
-                np.save(EMBEDDINGS_FILE, np.array(all_embeddings))
+                # Save chunks, embeddings and metadata
+                save_index(all_chunks, all_embeddings)
                 st.success(
                     f" {len(all_chunks)} chunks created from {len(uploaded_files)} PDFs!"
                 )